@@ -0,0 +1,273 @@
+'''
+Local cache for game icons and store artwork.
+
+Images are downloaded concurrently over a shared HTTP session, stored once per content hash
+(so identical images used by several apps share one file) and given a size-bounded thumbnail
+when first stored. An SQLite index maps URLs to content hashes and tracks the last access
+of each image, so the least recently used images are evicted when the cache exceeds its
+disk budget.
+
+Run with `python assets.py` to cache the images of every owned game.
+'''
+# Standard library imports
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-party library imports
+import requests
+from PIL import Image
+
+# Image columns stored in game_details
+DETAIL_IMAGE_COLUMNS = ['header_image', 'capsule_image', 'capsule_imagev5']
+
+
+# File extensions of the image formats PIL reports, other formats use their lower-cased name
+IMAGE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp', 'ICO': '.ico', 'BMP': '.bmp'}
+
+
+def contentExtension(content):
+    # Extension from the image bytes rather than the URL, so identical bytes always share one file.
+    # None if Pillow cannot identify the bytes as an image
+    try:
+        image_format = Image.open(io.BytesIO(content)).format
+    except OSError:
+        return None
+    if not image_format:
+        return None
+    return IMAGE_EXTENSIONS.get(image_format, f'.{image_format.lower()}')
+
+
+def partPath(path):
+    # Temporary file name unique to the current thread, so concurrent writers never collide
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.part'
+
+
+class AssetCache:
+    def __init__(self, root='assets', max_bytes=500 * 1024 * 1024, thumbnail_size=(184, 69),
+                 workers=8, session=None) -> None:
+        '''
+        Initialisation of the AssetCache class.
+
+        Parameters:
+            root (str): The directory holding the cached images and the index.
+            max_bytes (int): The disk budget for images and thumbnails together.
+            thumbnail_size (tuple): The bounding box thumbnails are scaled down to fit.
+            workers (int): The number of concurrent downloads.
+            session (Session): Optional requests session, a pooled one is created by default.
+        '''
+        self.root = root
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.workers = workers
+
+        # Reuse connections across downloads, with a pool large enough for every worker
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+        os.makedirs(root, exist_ok=True)
+        self.index = sqlite3.connect(os.path.join(root, 'index.sqlite'))
+        self.index.executescript('''
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+        ''')
+
+    def imagePath(self, content_hash, ext):
+        return os.path.join(self.root, 'images', content_hash[:2], content_hash + ext)
+
+    def thumbnailPath(self, content_hash):
+        return os.path.join(self.root, 'thumbnails', content_hash[:2], content_hash + '.jpg')
+
+    def download(self, url):
+        '''
+        Download one image and store it under its content hash.
+
+        Runs on a worker thread, so it only touches the filesystem and not the index.
+
+        Returns:
+            tuple: The URL, content hash, file extension and bytes used, or None on failure.
+        '''
+        try:
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as err:
+            print(f"Request Error: {err}")
+            return None
+
+        content = response.content
+        content_hash = hashlib.sha256(content).hexdigest()
+        ext = contentExtension(content)
+        if ext is None:
+            # An error page or other non-image response is not cached
+            print(f"Not an image: {url}")
+            return None
+        path = self.imagePath(content_hash, ext)
+
+        # Identical content from another URL is already on disk
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary name first so a partial file is never picked up
+            part = partPath(path)
+            with open(part, 'wb') as image_file:
+                image_file.write(content)
+            os.replace(part, path)
+
+        size = len(content) + self.makeThumbnail(content_hash, content)
+        return url, content_hash, ext, size
+
+    def makeThumbnail(self, content_hash, content):
+        '''
+        Generate the thumbnail for an image if it does not exist yet.
+
+        Returns:
+            int: The size of the thumbnail in bytes, 0 if it could not be generated.
+        '''
+        path = self.thumbnailPath(content_hash)
+        if not os.path.exists(path):
+            try:
+                image = Image.open(io.BytesIO(content))
+                image.thumbnail(self.thumbnail_size)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                part = partPath(path)
+                image.convert('RGB').save(part, format='JPEG', quality=85)
+                os.replace(part, path)
+            except OSError as err:
+                print(f"Thumbnail Error for {content_hash}: {err}")
+                return 0
+        return os.path.getsize(path)
+
+    def fetchMany(self, urls):
+        '''
+        Make sure every URL is cached, downloading the missing ones concurrently.
+
+        Parameters:
+            urls (iterable): The image URLs to cache. Empty values are ignored.
+
+        Returns:
+            dict: A dictionary mapping each cached URL to its image path.
+        '''
+        urls = {url for url in urls if url}
+        cached = self.lookup(urls)
+        missing = [url for url in urls if url not in cached]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = [result for result in executor.map(self.download, missing) if result]
+
+            now = time.time()
+            with self.index:
+                for url, content_hash, ext, size in results:
+                    self.index.execute('INSERT OR REPLACE INTO urls (url, hash) VALUES (?, ?)', (url, content_hash))
+                    self.index.execute('''
+                        INSERT INTO blobs (hash, ext, size, last_access) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(hash) DO UPDATE SET last_access = excluded.last_access
+                    ''', (content_hash, ext, size, now))
+                    cached[url] = self.imagePath(content_hash, ext)
+
+            # Drop anything the budget could not keep, even from this batch
+            self.evict()
+            cached = {url: path for url, path in cached.items() if os.path.exists(path)}
+
+        return cached
+
+    def fetch(self, url):
+        '''
+        Get the local path of an image, downloading it if it is not cached.
+        '''
+        return self.fetchMany([url]).get(url)
+
+    def thumbnail(self, url):
+        '''
+        Get the local path of an image's thumbnail, downloading the image if it is not cached.
+        '''
+        path = self.fetch(url)
+        if path is None:
+            return None
+        content_hash = os.path.splitext(os.path.basename(path))[0]
+        thumbnail_path = self.thumbnailPath(content_hash)
+        return thumbnail_path if os.path.exists(thumbnail_path) else None
+
+    def lookup(self, urls):
+        '''
+        Find the URLs that are already cached and mark them as accessed.
+
+        Returns:
+            dict: A dictionary mapping each cached URL to its image path.
+        '''
+        cached = {}
+        now = time.time()
+        with self.index:
+            for url in urls:
+                row = self.index.execute('''
+                    SELECT blobs.hash, blobs.ext FROM urls JOIN blobs ON blobs.hash = urls.hash
+                    WHERE urls.url = ?
+                ''', (url,)).fetchone()
+                if row is None:
+                    continue
+                path = self.imagePath(*row)
+                if os.path.exists(path):
+                    self.index.execute('UPDATE blobs SET last_access = ? WHERE hash = ?', (now, row[0]))
+                    cached[url] = path
+        return cached
+
+    def evict(self):
+        '''
+        Remove the least recently used images until the cache fits its disk budget.
+        '''
+        total = self.index.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self.index.execute('SELECT hash, ext, size FROM blobs ORDER BY last_access ASC').fetchall()
+        with self.index:
+            for content_hash, ext, size in rows:
+                if total <= self.max_bytes:
+                    break
+                for path in (self.imagePath(content_hash, ext), self.thumbnailPath(content_hash)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self.index.execute('DELETE FROM urls WHERE hash = ?', (content_hash,))
+                self.index.execute('DELETE FROM blobs WHERE hash = ?', (content_hash,))
+                total -= size
+
+
+def gameImageUrls():
+    '''
+    Collect the icon and store artwork URLs of every owned game from the database.
+
+    Returns:
+        list: The image URLs.
+    '''
+    # Imported here so the cache itself can be used without the database
+    import loadData
+    import recommendation
+
+    selection = recommendation.GameSelection(show_plots=False)
+    urls = loadData.dataSetUp.iconUrls(selection.allgames()).dropna().tolist()
+    df_details = selection.gamedetails()
+    for column in DETAIL_IMAGE_COLUMNS:
+        if column in df_details.columns:
+            urls.extend(df_details[column].dropna().tolist())
+    return urls
+
+
+if __name__ == '__main__':
+    cache = AssetCache()
+    cached = cache.fetchMany(gameImageUrls())
+    print(f"{len(cached)} images cached in {cache.root}")
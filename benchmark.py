@@ -0,0 +1,248 @@
+'''
+Benchmarks for the data loading and description cleaning paths.
+
+Run with `python benchmark.py`. The benchmarks run by default use synthetic data so they
+do not need the Steam API or the database.
+'''
+# Standard library imports
+import random
+import time
+import timeit
+import tracemalloc
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+# Local application imports
+import loadData
+import recommendation
+
+
+def syntheticOwnedGames(count):
+    '''
+    Build a synthetic 'games' list shaped like a GetOwnedGames API response.
+
+    Parameters:
+        count (int): The number of games to generate.
+
+    Returns:
+        list: A list of game dictionaries.
+    '''
+    rng = random.Random(0)
+    games = []
+    for appid in range(10, 10 + count * 10, 10):
+        game = {
+            'appid': appid,
+            'name': f'Game {appid}',
+            'playtime_forever': rng.randint(0, 50000),
+            'img_icon_url': f'{rng.getrandbits(160):040x}'
+        }
+        # Only a small share of games have been played in the last two weeks
+        if rng.random() < 0.02:
+            game['playtime_2weeks'] = rng.randint(1, 3000)
+        games.append(game)
+    return games
+
+
+def legacyOwnedGames(games, status):
+    '''
+    Reference implementation of the original row-by-row owned games parsing.
+
+    Parameters:
+        games (list): The 'games' list from the GetOwnedGames API response.
+        status (dict): A dictionary mapping status column names to arrays of Game IDs.
+
+    Returns:
+        DataFrame: A DataFrame containing details of owned games.
+    '''
+    status_frames = {column: pd.DataFrame({'Game ID': ids}) for column, ids in status.items()}
+    game_data = []
+    for game in games:
+        appid = game['appid']
+        img_icon_url = game.get('img_icon_url')
+        game_data.append({
+            'Game ID': appid,
+            'Name': game.get('name', 'N/A'),
+            'Playtime (2 weeks)': game.get('playtime_2weeks', 0),
+            'Playtime (forever)': game.get('playtime_forever', 0),
+            'Icon URL': f"http://media.steampowered.com/steamcommunity/public/images/apps/{appid}/{img_icon_url}.jpg",
+            'Completed': 1 if appid in status_frames['Completed']['Game ID'].values else 0,
+            'Broken': 1 if appid in status_frames['Broken']['Game ID'].values else 0,
+            'Endless': 1 if appid in status_frames['Endless']['Game ID'].values else 0,
+            'selected': 1 if appid in status_frames['selected']['Game ID'].values else 0
+        })
+    return pd.DataFrame(game_data)
+
+
+def measure(func, *args):
+    '''
+    Run a function once and measure its wall time and peak traced memory.
+
+    Returns:
+        tuple: The function result, the elapsed seconds and the peak memory in bytes.
+    '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmarkOwnedGames(count=5000):
+    '''
+    Compare the compact owned games parsing with the original implementation.
+
+    Parameters:
+        count (int): The number of synthetic games to parse.
+    '''
+    games = syntheticOwnedGames(count)
+    ids = np.array([game['appid'] for game in games])
+    status = {column: ids[offset::40] for offset, column in enumerate(('Completed', 'Broken', 'Endless', 'selected'))}
+
+    legacy_df, legacy_time, legacy_peak = measure(legacyOwnedGames, games, status)
+    compact_df, compact_time, compact_peak = measure(loadData.dataSetUp.parseOwnedGames, games, status)
+
+    print(f"Owned games ({count} games)")
+    print(f"  legacy:  {legacy_time:.3f}s, peak {legacy_peak / 1e6:.1f} MB, frame {legacy_df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    print(f"  compact: {compact_time:.3f}s, peak {compact_peak / 1e6:.1f} MB, frame {compact_df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+
+
+def benchmarkAppDetails(app_ids=(1150440, 205930, 214490)):
+    '''
+    Compare the full and the field-filtered appdetails requests for a few apps.
+
+    This one calls the Steam Store API, so it needs network access and a configured
+    secrets_store. Each request is followed by getgameInfo's usual rate limit pause.
+
+    Parameters:
+        app_ids (iterable): The app IDs to fetch.
+    '''
+    data_setup = loadData.dataSetUp()
+    data_setup.fetch_stats = []
+    for app_id in app_ids:
+        data_setup.getgameInfo(app_id, filtered=False)
+        data_setup.getgameInfo(app_id, filtered=True)
+
+    stats = pd.DataFrame(data_setup.fetch_stats)
+    print("appdetails per app")
+    print(stats.groupby('Filtered')[['Bytes', 'Wire Bytes', 'Parse Seconds']].mean())
+
+
+# HTML fragments covering the markup, entities and malformed input seen in game descriptions
+HTML_CORPUS = [
+    '',
+    '   ',
+    'plain text',
+    'a<br>b',
+    'x<br/>y',
+    '<p>a</p>\n<p>b</p>',
+    '<p>a</p>   <p>b</p> \t <i>c</i>&#32;&nbsp;<b>d</b>',
+    '<h2 class="bb_tag">About This Game</h2><ul class="bb_ul"><li>One</li><li>Two</li></ul>',
+    '<img src="https://cdn.akamai.steamstatic.com/steam/apps/1/extras/a.gif?t=1">',
+    '<a href="https://steamcommunity.com/linkfilter/?url=https://a.com/?x=1&amp;y=2" target="_blank" rel="">link</a>',
+    '<a href="x>y" title=\'p>q\'>quoted</a>',
+    '<a\nhref="x">y</a >',
+    '<a b=c>d</a>',
+    'x &amp; y &lt;b&gt; &#39;q&#39; &nbsp;z &copy; &#150; &#x27; &quot;',
+    'x &copy y &foo; &a-b; &#; &ampb &amp;amp;',
+    'a &#0; b &#xD800; c &#99999999; &#x80;',
+    'Tom & Jerry, 5 < 6 and c<3',
+    'a<!-- comment -->b',
+    '<!DOCTYPE html><html><body>hi</body></html>',
+    '<?php echo 1; ?>after',
+    '<![CDATA[x]]>y',
+    '<script>var x = "<b>";</script>ok',
+    '<style>p { color: red; }</style>ok',
+    '<pre> keep  this </pre>',
+    'bad <a href="x',
+    'text <b',
+    'Intro <!-- unclosed <b>Bold</b> tail',
+    '<!-->',
+    'a</>b',
+    '</ b>x',
+    '<?"text<p class="x">"/>&',
+    '<!DOCTYPE html "x>y">z',
+    "<i'<a href='y'>'>",
+    '<a title="a<b">c</a>',
+    '<a href = "x>y">z</a>',
+    '</p>',
+    '<p>caf\u00e9 \u2014 \u30b2\u30fc\u30e0</p>',
+    '<strong>[b]Bold[/b]</strong> [img]{STEAM_APP_IMAGE}/extras/a.png[/img] [url=https://a.com]link[/url]'
+]
+
+
+def syntheticDescriptions(count):
+    '''
+    Build synthetic descriptions shaped like Steam's detailed_description HTML.
+
+    Parameters:
+        count (int): The number of descriptions to generate.
+
+    Returns:
+        list: The HTML descriptions.
+    '''
+    rng = random.Random(0)
+    words = ['explore', 'dungeon', 'co-op', 'story', 'puzzle', 'Tom &amp; Jerry', 'crafting', '&quot;epic&quot;',
+             'open-world', 'caf\u00e9', 'roguelike', 'boss&nbsp;fights']
+    descriptions = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(3, 8)):
+            sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 30)))
+            heading = ' '.join(rng.choice(words) for _ in range(3))
+            parts.append(rng.choice([
+                f'<p class="bb_paragraph">{sentence}</p>',
+                f'<h2 class="bb_tag">{heading}</h2>',
+                f'<ul class="bb_ul"><li>{sentence}</li><li><strong>{heading}</strong></li></ul>',
+                f'<img src="https://cdn.akamai.steamstatic.com/steam/apps/{rng.randint(1, 10**6)}/extras/a.gif?t=1"><br>',
+                f'{sentence}<br><br>',
+            ]))
+        descriptions.append('\n'.join(parts))
+    return descriptions
+
+
+def checkHtmlEquivalence(descriptions=()):
+    '''
+    Check that htmlToText gives the same text as BeautifulSoup for the corpus and descriptions.
+
+    Parameters:
+        descriptions (iterable): Further HTML to check, e.g. stored descriptions.
+
+    Returns:
+        list: The inputs whose text differs.
+    '''
+    mismatches = [text for text in [*HTML_CORPUS, *descriptions]
+                  if recommendation.htmlToText(text) != BeautifulSoup(text, 'html.parser').get_text(separator=' ')]
+    print(f"HTML to text: {len(mismatches)} mismatches")
+    for text in mismatches:
+        print(f"  {text!r}")
+    return mismatches
+
+
+def benchmarkHtmlCleaning(count=2000):
+    '''
+    Compare the throughput of htmlToText with a BeautifulSoup parse of every description.
+
+    Parameters:
+        count (int): The number of synthetic descriptions to clean.
+    '''
+    descriptions = syntheticDescriptions(count)
+    checkHtmlEquivalence(descriptions)
+    megabytes = sum(len(text) for text in descriptions) / 1e6
+
+    parsed_time = timeit.timeit(lambda: [BeautifulSoup(text, 'html.parser').get_text(separator=' ') for text in descriptions], number=1)
+    fast_time = timeit.timeit(lambda: [recommendation.htmlToText(text) for text in descriptions], number=1)
+
+    print(f"HTML to text ({count} descriptions, {megabytes:.1f} MB)")
+    print(f"  BeautifulSoup: {parsed_time:.3f}s, {megabytes / parsed_time:.1f} MB/s")
+    print(f"  htmlToText:    {fast_time:.3f}s, {megabytes / fast_time:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    benchmarkOwnedGames()
+    benchmarkHtmlCleaning()
@@ -0,0 +1,195 @@
+'''
+Columnar snapshots of the owned games and game details tables.
+
+Each snapshot is written with a fixed Arrow schema, split into partitions by Game ID range.
+Within a partition the columns are stored in groups, so columns that change often (playtime)
+are written apart from those that rarely do, and a playtime change only rewrites the narrow
+playtime files. Every group keeps the Game ID column, so the groups line up row for row. Parquet files are zstd compressed for storage and transfer. Arrow IPC files are uncompressed
+so downstream consumers can memory-map them and read the columns without copying. A manifest
+keeps a hash of every partition, so partitions whose rows have not changed are not rewritten.
+'''
+# Standard library imports
+import hashlib
+import json
+import os
+
+# Third-party library imports
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Stable schemas of the exported snapshots
+SCHEMAS = {
+    'owned_games': pa.schema([
+        ('Game ID', pa.int32()),
+        ('Name', pa.string()),
+        ('Playtime (2 weeks)', pa.uint32()),
+        ('Playtime (forever)', pa.uint32()),
+        ('Icon Hash', pa.string()),
+        ('Completed', pa.bool_()),
+        ('Broken', pa.bool_()),
+        ('Endless', pa.bool_()),
+        ('selected', pa.bool_())
+    ]),
+    'game_details': pa.schema([
+        ('Game ID', pa.int32()),
+        ('Name', pa.string()),
+        ('Genre', pa.string()),
+        ('Controller Support', pa.string()),
+        ('Is Free', pa.bool_()),
+        ('Released', pa.string()),
+        ('Windows', pa.bool_()),
+        ('Mac', pa.bool_()),
+        ('Linux', pa.bool_()),
+        ('Metacritic Score', pa.int32()),
+        ('Metacritic Url', pa.string()),
+        ('header_image', pa.string()),
+        ('capsule_image', pa.string()),
+        ('capsule_imagev5', pa.string()),
+        ('website', pa.string())
+    ])
+}
+
+# Column groups stored as separate files, every group starts with the Game ID
+COLUMN_GROUPS = {
+    'owned_games': {
+        'static': ['Game ID', 'Name', 'Icon Hash', 'Completed', 'Broken', 'Endless', 'selected'],
+        'playtime': ['Game ID', 'Playtime (2 weeks)', 'Playtime (forever)']
+    },
+    'game_details': {
+        'details': SCHEMAS['game_details'].names
+    }
+}
+
+# Number of consecutive Game IDs per partition
+PARTITION_SIZE = 250000
+
+# File extension per supported format
+FORMATS = {'parquet': '.parquet', 'ipc': '.arrow'}
+
+
+def toTable(df, name, columns=None):
+    '''
+    Convert a DataFrame to an Arrow table with the snapshot's schema.
+
+    Columns missing from the DataFrame are filled with nulls and extra columns are dropped.
+    columns limits the table to some of the snapshot's columns.
+    '''
+    schema = SCHEMAS[name]
+    if columns is not None:
+        schema = pa.schema([schema.field(column) for column in columns])
+    df = df.reindex(columns=schema.names)
+    # Nullable integer columns arrive as floats with NaN, convert them to pandas' nullable type.
+    # Boolean columns read back from MySQL arrive as integers
+    for field in schema:
+        if pa.types.is_integer(field.type) and df[field.name].dtype.kind == 'f':
+            df[field.name] = df[field.name].astype('Int64')
+        elif pa.types.is_boolean(field.type) and df[field.name].dtype.kind in 'Oiuf':
+            df[field.name] = df[field.name].astype('boolean')
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def partitionHash(df):
+    # Hash of the rows' values, independent of the file format
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def writeSnapshot(df, name, root='exports', formats=('parquet', 'ipc')):
+    '''
+    Write a snapshot, rewriting only the partitions whose rows changed.
+
+    Parameters:
+        df (DataFrame): The rows of the snapshot.
+        name (str): The snapshot name, a key of SCHEMAS.
+        root (str): The export directory.
+        formats (tuple): The formats to write, keys of FORMATS.
+
+    Returns:
+        list: The partition column groups that were written.
+    '''
+    directory = os.path.join(root, name)
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        manifest = {}
+
+    df = df.sort_values('Game ID').reset_index(drop=True)
+    partitions = df['Game ID'] // PARTITION_SIZE
+    written = []
+    new_manifest = {}
+
+    for partition, partition_df in df.groupby(partitions, sort=True):
+        for group, columns in COLUMN_GROUPS[name].items():
+            key = f'partition={int(partition)}.{group}'
+            table = toTable(partition_df, name, columns)
+            digest = partitionHash(table.to_pandas())
+            new_manifest[key] = {'hash': digest, 'formats': list(formats), 'rows': table.num_rows}
+
+            # Skip groups already written with the same rows in every requested format
+            previous = manifest.get(key, {})
+            if previous.get('hash') == digest and set(formats) <= set(previous.get('formats', [])):
+                new_manifest[key]['formats'] = previous['formats']
+                continue
+
+            for file_format in formats:
+                path = os.path.join(directory, key + FORMATS[file_format])
+                if file_format == 'parquet':
+                    pq.write_table(table, path + '.part', compression='zstd')
+                else:
+                    with pa.OSFile(path + '.part', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(path + '.part', path)
+            written.append(key)
+
+    # Remove partitions that no longer hold any rows, and files of an earlier layout
+    for key, entry in manifest.items():
+        if key not in new_manifest:
+            for file_format in entry.get('formats', []):
+                path = os.path.join(directory, key + FORMATS[file_format])
+                if os.path.exists(path):
+                    os.remove(path)
+
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump(new_manifest, manifest_file, indent=4)
+
+    return written
+
+
+def readSnapshot(name, root='exports', file_format='ipc'):
+    '''
+    Read a snapshot as an Arrow table.
+
+    Arrow IPC partitions are memory-mapped, so the returned columns reference the files
+    without copying. Parquet partitions are memory-mapped too but still need decompressing.
+
+    Parameters:
+        name (str): The snapshot name, a key of SCHEMAS.
+        root (str): The export directory.
+        file_format (str): The format to read, a key of FORMATS.
+
+    Returns:
+        Table: The snapshot rows with the snapshot's schema.
+    '''
+    directory = os.path.join(root, name)
+    with open(os.path.join(directory, 'manifest.json')) as manifest_file:
+        keys = json.load(manifest_file)
+    partitions = sorted({int(key.split('=')[1].split('.')[0]) for key in keys})
+
+    def readGroup(group):
+        paths = [os.path.join(directory, f'partition={partition}.{group}{FORMATS[file_format]}') for partition in partitions]
+        if file_format == 'parquet':
+            return pa.concat_tables([pq.read_table(path, memory_map=True) for path in paths])
+        return pa.concat_tables([pa.ipc.open_file(pa.memory_map(path, 'r')).read_all() for path in paths])
+
+    if not partitions:
+        return SCHEMAS[name].empty_table()
+    # The groups share their row order, so their columns are put side by side without a join
+    columns = {}
+    for group in COLUMN_GROUPS[name]:
+        table = readGroup(group)
+        for column in table.column_names:
+            columns.setdefault(column, table.column(column))
+    return pa.table([columns[column] for column in SCHEMAS[name].names], schema=SCHEMAS[name])
@@ -1,16 +1,46 @@
 # Standard library imports
+import json
 import time
+from datetime import datetime, timedelta
 
 # Third-party library imports
 import requests
+import numpy as np
 import pandas as pd
 import sqlalchemy
 
+# orjson decodes noticeably faster than the standard library, but is optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Local application imports
 import secrets_store
 import recommendation
 import writeData
 
+# URL of a game's icon, derived from its app ID and the icon hash returned by the API
+ICON_URL = 'http://media.steampowered.com/steamcommunity/public/images/apps/{appid}/{icon}.jpg'
+
+# appdetails field groups holding every field getgameInfo extracts. 'basic' covers the name,
+# descriptions, reviews, images, website, is_free and controller_support
+APPDETAILS_FILTERS = 'basic,genres,platforms,metacritic,release_date'
+
+def decodeJson(content):
+    '''
+    Decode a JSON response body, using orjson when it is installed.
+
+    Parameters:
+        content (bytes): The raw response body.
+
+    Returns:
+        The decoded JSON document.
+    '''
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 class dataSetUp:
     def __init__(self) -> None:
         '''
@@ -38,6 +68,10 @@ class dataSetUp:
         
         # Initialise a writeData object to handle data writing operations
         self.record_data = writeData.WriteData()
+
+        # Bytes transferred and parse time of each appdetails request, collected only when set to
+        # a list (e.g. by benchmark.py), so a long running scheduler does not accumulate them
+        self.fetch_stats = None
     
     def getOwnedGames(self):
         '''
@@ -65,56 +99,9 @@ class dataSetUp:
 
             # Check if the response contains game information
             if 'response' in data and 'games' in data['response']:
-                # Extract the list of games
+                # Extract the list of games and parse it straight into typed columns
                 games = data['response']['games']
-                game_data = []
-                
-                # Load additional game status information from local CSV files
-                df_completed = pd.read_csv(r'gameStatus/completedgames.csv') 
-                df_broken = pd.read_csv(r'gameStatus/brokengames.csv')
-                df_endless = pd.read_csv(r'gameStatus/endless.csv')
-                df_selected = pd.read_csv(r'gameStatus/selectedgames.csv')
-
-                # Iterate through each game in the list
-                for game in games:
-                    # Extract the game ID
-                    appid = game['appid']
-
-                    # Extract the game name, default to 'N/A' if not available
-                    name = game.get('name', 'N/A')
-
-                    # Extract playtime in the last 2 weeks, default to 0
-                    playtime_2weeks = game.get('playtime_2weeks', 0)
-
-                    # Extract total playtime, default to 0
-                    playtime_forever = game.get('playtime_forever', 0)
-
-                    # Extract the icon URL
-                    img_icon_url = game.get('img_icon_url')
-
-                    # Get the game status flags from the corresponding CSV files
-                    completed_game = dataSetUp.get_flag_value(appid, df_completed)
-                    broken_game = dataSetUp.get_flag_value(appid, df_broken)
-                    endless_game = dataSetUp.get_flag_value(appid, df_endless)
-                    selected_game = dataSetUp.get_flag_value(appid, df_selected)
-                    
-
-                    # Append game data to the list
-                    game_data.append({
-                        'Game ID': appid,
-                        'Name': name,
-                        'Playtime (2 weeks)': playtime_2weeks,
-                        'Playtime (forever)': playtime_forever,
-                        'Icon URL': f"http://media.steampowered.com/steamcommunity/public/images/apps/{appid}/{img_icon_url}.jpg",
-                        'Completed': completed_game,
-                        'Broken': broken_game,
-                        'Endless': endless_game,
-                        'selected': selected_game
-                       
-                    })
-
-                # Create a DataFrame from the list of game data
-                df = pd.DataFrame(game_data)
+                df = dataSetUp.parseOwnedGames(games, dataSetUp.loadGameStatus())
 
                 return df
             else:
@@ -123,7 +110,288 @@ class dataSetUp:
         else:
             # Print an error message if the API request fails
             print(f"Error: {response.status_code}, {response.text}")
-    
+
+    def loadGameStatus():
+        '''
+        Load the game status lists from the local CSV files.
+
+        Only the 'Game ID' column of each file is read, as the remaining columns are not
+        needed to flag a game.
+
+        Returns:
+            dict: A dictionary mapping each status column name to a numpy array of Game IDs.
+        '''
+        # Map each status column to the CSV file listing the games with that status
+        status_files = {
+            'Completed': r'gameStatus/completedgames.csv',
+            'Broken': r'gameStatus/brokengames.csv',
+            'Endless': r'gameStatus/endless.csv',
+            'selected': r'gameStatus/selectedgames.csv'
+        }
+
+        # Read only the Game ID column from each file
+        return {
+            column: pd.read_csv(path, usecols=['Game ID'])['Game ID'].to_numpy()
+            for column, path in status_files.items()
+        }
+
+    def parseOwnedGames(games, status):
+        '''
+        Parse the games list from a GetOwnedGames response into a compact DataFrame.
+
+        The games are written straight into pre-allocated typed arrays rather than being
+        collected as one dictionary per game first. App IDs are stored as int32, playtimes
+        as uint32, the status flags as bool and the names as a categorical. The icon URL is
+        not stored per row; only the icon hash is kept and the URL can be derived when
+        needed with iconUrls.
+
+        Parameters:
+            games (list): The 'games' list from the GetOwnedGames API response.
+            status (dict): A dictionary mapping status column names to arrays of Game IDs,
+                           as returned by loadGameStatus.
+
+        Returns:
+            DataFrame: A DataFrame containing details of owned games.
+        '''
+        count = len(games)
+
+        # Pre-allocate the typed columns
+        app_ids = np.empty(count, dtype=np.int32)
+        playtime_2weeks = np.zeros(count, dtype=np.uint32)
+        playtime_forever = np.zeros(count, dtype=np.uint32)
+        names = [None] * count
+        icon_hashes = [None] * count
+
+        # Fill the columns in a single pass over the response
+        for i, game in enumerate(games):
+            app_ids[i] = game['appid']
+            names[i] = game.get('name', 'N/A')
+            playtime_2weeks[i] = game.get('playtime_2weeks', 0)
+            playtime_forever[i] = game.get('playtime_forever', 0)
+            icon_hashes[i] = game.get('img_icon_url')
+
+        df = pd.DataFrame({
+            'Game ID': app_ids,
+            'Name': pd.Categorical(names),
+            'Playtime (2 weeks)': playtime_2weeks,
+            'Playtime (forever)': playtime_forever,
+            'Icon Hash': icon_hashes
+        })
+
+        # Flag each game with a vectorised lookup against the status lists
+        for column in ('Completed', 'Broken', 'Endless', 'selected'):
+            df[column] = np.isin(app_ids, status[column])
+
+        return df
+
+    def iconUrls(df):
+        '''
+        Derive the icon URL of each game from its Game ID and icon hash.
+
+        Parameters:
+            df (DataFrame): DataFrame containing 'Game ID' and 'Icon Hash' columns.
+
+        Returns:
+            Series: The icon URL for each row, or None where the game has no icon.
+        '''
+        return pd.Series(
+            [ICON_URL.format(appid=appid, icon=icon) if icon else None
+             for appid, icon in zip(df['Game ID'], df['Icon Hash'])],
+            index=df.index,
+            name='Icon URL'
+        )
+
+    def getRecentlyPlayedGames(self):
+        '''
+        Fetch the games played in the last two weeks from the Steam API.
+
+        Returns:
+            DataFrame: A DataFrame with the Game ID, Name and playtimes of each recently played
+                       game, which is empty if nothing was played. None if the request fails.
+        '''
+        # Construct the URL for the Steam API request to get recently played games
+        url = f'http://api.steampowered.com/IPlayerService/GetRecentlyPlayedGames/v0001/?key={self.api_key}&steamid={self.steam_id}&format=json'
+
+        # Send the GET request to the Steam API
+        response = requests.get(url)
+
+        if response.status_code == 200:
+            # A response without a games list means nothing was played recently
+            games = response.json().get('response', {}).get('games', [])
+
+            return pd.DataFrame({
+                'Game ID': np.array([game['appid'] for game in games], dtype=np.int32),
+                'Name': [game.get('name', 'N/A') for game in games],
+                'Playtime (2 weeks)': np.array([game.get('playtime_2weeks', 0) for game in games], dtype=np.uint32),
+                'Playtime (forever)': np.array([game.get('playtime_forever', 0) for game in games], dtype=np.uint32)
+            })
+        else:
+            # Print an error message if the API request fails
+            print(f"Error: {response.status_code}, {response.text}")
+
+    def updateRecentPlaytime(self, df_recent):
+        '''
+        Update the playtime of recently played games in the owned games table.
+
+        Games that are stored with a two week playtime but no longer appear in the recently
+        played list have their two week playtime reset to 0.
+
+        Parameters:
+            df_recent (DataFrame): DataFrame returned by getRecentlyPlayedGames.
+
+        Returns:
+            list: The Game IDs whose stored playtime changed.
+        '''
+        # Load the stored playtimes of the recent games and of any game with a two week playtime
+        recent_ids = [int(game_id) for game_id in df_recent['Game ID']]
+        query = sqlalchemy.text('''
+            SELECT `Game ID`, `Playtime (2 weeks)`, `Playtime (forever)` FROM steamdata.owned_games
+            WHERE `Playtime (2 weeks)` != 0 OR `Game ID` IN :recent_ids;
+        ''').bindparams(sqlalchemy.bindparam('recent_ids', expanding=True))
+        stored = pd.read_sql(query, self.engine, params={'recent_ids': recent_ids or [-1]}).set_index('Game ID')
+
+        changed = []
+
+        # Update the games played in the last two weeks
+        for row in df_recent.itertuples(index=False):
+            game_id = int(row[0])
+            if game_id not in stored.index:
+                # Unknown games are added by the full owned games sync
+                continue
+            for column, value in (('Playtime (2 weeks)', row[2]), ('Playtime (forever)', row[3])):
+                if stored.at[game_id, column] != value:
+                    self.record_data.altervalue('owned_games', column, int(value), game_id)
+                    if game_id not in changed:
+                        changed.append(game_id)
+
+        # Reset the games that dropped out of the last two weeks
+        for game_id in stored.index.difference(recent_ids):
+            if stored.at[game_id, 'Playtime (2 weeks)'] != 0:
+                self.record_data.altervalue('owned_games', 'Playtime (2 weeks)', 0, game_id)
+                changed.append(int(game_id))
+
+        return changed
+
+    def syncOwnedGames(self, full_interval=timedelta(days=1), force_full=False):
+        '''
+        Sync the owned games table, fetching the full library only when it may have changed.
+
+        The recently played list is fetched first and only those games have their playtime
+        updated. The status flags from the local CSV files are applied on every sync. The full
+        owned games list is reconciled when the last full sync is older than full_interval, or
+        when a recently played game is not stored yet, which means the library gained a game.
+
+        Parameters:
+            full_interval (timedelta): The maximum age of the last full sync.
+            force_full (bool): Always reconcile the full owned games list.
+
+        Returns:
+            tuple: Whether a full sync ran, and the Game IDs that changed (None after a full sync,
+                   as any game may have changed).
+        '''
+        now = datetime.now()
+        df_recent = self.getRecentlyPlayedGames()
+        last_full = self.record_data.lastSync('full')
+
+        full = force_full or df_recent is None or last_full is None or now - last_full >= full_interval
+        if not full and not df_recent.empty:
+            # A recently played game that is not stored is a new addition to the library
+            recent_ids = [int(game_id) for game_id in df_recent['Game ID']]
+            query = sqlalchemy.text('''
+                SELECT `Game ID` FROM steamdata.owned_games WHERE `Game ID` IN :recent_ids;
+            ''').bindparams(sqlalchemy.bindparam('recent_ids', expanding=True))
+            stored_ids = pd.read_sql(query, self.engine, params={'recent_ids': recent_ids})['Game ID']
+            full = len(stored_ids) < len(set(recent_ids))
+
+        if full:
+            df = self.getOwnedGames()
+            if df is None:
+                return False, []
+            self.record_data.writeData(df, 'owned_games')
+            self.record_data.recordSync('full', now, len(df))
+            return True, None
+
+        # The status lists are local files, so they are applied on every sync
+        changed = self.updateRecentPlaytime(df_recent)
+        changed += [game_id for game_id in self.updateGameStatus() if game_id not in changed]
+        self.record_data.recordSync('recent', now, len(df_recent))
+        return False, changed
+
+    def updateGameStatus(self):
+        '''
+        Apply the game status lists from the local CSV files to the owned games table.
+
+        Returns:
+            list: The Game IDs whose status flags changed.
+        '''
+        status_columns = ['Completed', 'Broken', 'Endless', 'selected']
+        stored = pd.read_sql('SELECT `Game ID`, `Completed`, `Broken`, `Endless`, `selected` FROM steamdata.owned_games;', self.engine)
+        status = dataSetUp.loadGameStatus()
+
+        flags = stored[['Game ID']].copy()
+        for column in status_columns:
+            flags[column] = np.isin(flags['Game ID'], status[column])
+
+        # Only write the games whose flags differ from the stored ones
+        changed = (flags[status_columns].to_numpy() != stored[status_columns].astype(bool).to_numpy()).any(axis=1)
+        self.record_data.upsert(flags[changed], 'owned_games')
+        return [int(game_id) for game_id in flags.loc[changed, 'Game ID']]
+
+    def getStaleGameDetails(self, cutoff, limit):
+        '''
+        Find the owned games whose details have not been fetched since a cutoff time.
+
+        Games that have never been fetched come first, then the oldest fetches. Games listed in
+        erroring.csv are skipped.
+
+        Parameters:
+            cutoff (datetime): Details fetched before this time are considered stale.
+            limit (int): The maximum number of games to return.
+
+        Returns:
+            list: The Game IDs to refresh, stalest first.
+        '''
+        # MySQL sorts NULL first in ascending order, so never fetched games lead
+        query = sqlalchemy.text('''
+            SELECT o.`Game ID` FROM steamdata.owned_games o
+            LEFT JOIN steamdata.sync_state s ON s.`Game ID` = o.`Game ID`
+            WHERE s.`Details Fetched At` IS NULL OR s.`Details Fetched At` < :cutoff
+            ORDER BY s.`Details Fetched At` ASC;
+        ''')
+        df_stale = pd.read_sql(query, self.engine, params={'cutoff': cutoff})
+
+        # Skip game IDs that have previously errored
+        try:
+            erroring_game_ids = pd.read_csv('erroring.csv')['Game ID'].tolist()
+        except FileNotFoundError:
+            erroring_game_ids = []
+
+        stale_ids = df_stale.loc[~df_stale['Game ID'].isin(erroring_game_ids), 'Game ID']
+        return [int(game_id) for game_id in stale_ids[:limit]]
+
+    def refreshGameDetails(self, app_id, fetched_at):
+        '''
+        Fetch a game's details again and replace the stored copy.
+
+        Parameters:
+            app_id (int): The ID of the game to refresh.
+            fetched_at (datetime): The time to record as the game's last fetch.
+
+        Returns:
+            bool: True if the details were fetched and stored, False otherwise.
+        '''
+        # The scheduler's rate limiter spaces these requests, so getgameInfo does not pause
+        df_game_details = self.getgameInfo(app_id, pause=0)
+
+        if df_game_details is None or df_game_details.empty:
+            # Record the failed fetch too, so a failing game is not retried every cycle
+            print(f"Error getting details for Game ID {app_id}")
+            self.record_data.recordDetailsFetched(app_id, fetched_at)
+            return False
+
+        # The fetch is recorded with the details, so a failed write is retried next cycle
+        return self.record_data.replaceGameDetails(df_game_details, fetched_at)
+
     def updateOwnedGamesInfo(self, df):
         '''
         Update the owned games table with the latest information.
@@ -251,17 +519,14 @@ class dataSetUp:
         '''
         owned_games = df
 
-        # Query to select all existing game details from the database
+        # Query to select the IDs of all games that already have details in the database
         query = '''
-            SELECT * FROM steamdata.game_details;
+            SELECT `Game ID` FROM steamdata.game_details;
         '''
         
         # Execute the query and store the result in a DataFrame
         df_gamedetails = pd.read_sql(query, self.engine)
 
-        # Print the existing game details for debugging purposes
-        print(df_gamedetails)
-
         # Get a list of existing game IDs from the game details DataFrame
         gamedetails_game_ids = df_gamedetails['Game ID'].tolist()
 
@@ -290,8 +555,9 @@ class dataSetUp:
 
             # Check if the game details DataFrame is not empty
             if not df_game_details.empty:
-                # Append the game details to the existing table in the database
-                df_game_details.to_sql('game_details', self.engine, if_exists='append', index=False)
+                # Append the game details to the database, with the long text stored compressed
+                self.record_data.writeGameDetails(df_game_details)
+                self.record_data.recordDetailsFetched(app_id, datetime.now())
             else:
                 # Add the game ID to the new errors list
                 print(f"Error getting details for Game ID {app_id}")
@@ -333,12 +599,20 @@ class dataSetUp:
         # Return the original list if it is not empty
         return dataCheck
     
-    def getgameInfo(self, app_id):
+    def getgameInfo(self, app_id, filtered=True, pause=3):
         '''
         Fetches detailed information for a given game from the Steam Store API and returns it as a DataFrame.
 
+        By default only the field groups in APPDETAILS_FILTERS are requested, so screenshots, movies,
+        packages and the like are never transferred. The bytes received and the JSON parse time of
+        each request are appended to self.fetch_stats when it is a list.
+
         Parameters:
             app_id (int): The ID of the game for which information is to be fetched.
+            filtered (bool): Request only the field groups the extraction needs. Set to False to
+                             download the full document, e.g. for comparison.
+            pause (float): Seconds to wait after a successful request to stay under the API rate
+                           limit. Callers that throttle their own requests pass 0.
 
         Returns:
             DataFrame: A DataFrame containing detailed game information if the API call is successful,
@@ -346,6 +620,8 @@ class dataSetUp:
         '''
         # Construct the URL for the Steam Store API request
         url = f'https://store.steampowered.com/api/appdetails/?appids={app_id}&key={self.api_key}'
+        if filtered:
+            url += f'&filters={APPDETAILS_FILTERS}'
 
         # Send the GET request to the API
         response = requests.get(url)
@@ -353,25 +629,38 @@ class dataSetUp:
         # Check if the request was successful
         if response.status_code == 200:
             try:
-                # Parse the JSON response
-                json_data = response.json()
+                # Parse the JSON response, timing the decode
+                start = time.perf_counter()
+                json_data = decodeJson(response.content)
+                parse_seconds = time.perf_counter() - start
+
+                # Record the payload size and parse time of this request
+                if self.fetch_stats is not None:
+                    self.fetch_stats.append({
+                        'Game ID': app_id,
+                        'Filtered': filtered,
+                        'Bytes': len(response.content),
+                        'Wire Bytes': int(response.headers.get('Content-Length', len(response.content))),
+                        'Parse Seconds': parse_seconds
+                    })
 
                 # Extract various pieces of game information, using helper method to handle empty lists
-                genres = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('genres', []))
-                platforms = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('platforms', []))
-                name = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('name', []))
-                metacritic = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('metacritic', []))
-                controller_support = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('controller_support', []))
-                is_free = json_data.get(f'{app_id}', {}).get('data', {}).get('is_free', [])
-                release_date = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('release_date', []))
-                detailed_description = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('detailed_description', []))
-                about_the_game = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('about_the_game', []))
-                short_description = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('short_description', []))
-                reviews = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('reviews', []))
-                header_image = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('header_image', []))
-                capsule_image = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('capsule_image', []))
-                capsule_imagev5 = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('capsule_imagev5', [])) 
-                website = self.checkforemptylist(json_data.get(f'{app_id}', {}).get('data', {}).get('website', [])) 
+                data = json_data.get(f'{app_id}', {}).get('data', {})
+                genres = self.checkforemptylist(data.get('genres', []))
+                platforms = self.checkforemptylist(data.get('platforms', []))
+                name = self.checkforemptylist(data.get('name', []))
+                metacritic = self.checkforemptylist(data.get('metacritic', []))
+                controller_support = self.checkforemptylist(data.get('controller_support', []))
+                is_free = data.get('is_free', [])
+                release_date = self.checkforemptylist(data.get('release_date', []))
+                detailed_description = self.checkforemptylist(data.get('detailed_description', []))
+                about_the_game = self.checkforemptylist(data.get('about_the_game', []))
+                short_description = self.checkforemptylist(data.get('short_description', []))
+                reviews = self.checkforemptylist(data.get('reviews', []))
+                header_image = self.checkforemptylist(data.get('header_image', []))
+                capsule_image = self.checkforemptylist(data.get('capsule_image', []))
+                capsule_imagev5 = self.checkforemptylist(data.get('capsule_imagev5', []))
+                website = self.checkforemptylist(data.get('website', []))
                 
                 # Extract the release date if available
                 if release_date is not None:
@@ -460,7 +749,8 @@ class dataSetUp:
                 }, index=[0])
                 
                 # Pause to avoid hitting API rate limits
-                time.sleep(3)
+                if pause:
+                    time.sleep(pause)
                 return df
             except:
                 return pd.DataFrame()
@@ -1,14 +1,15 @@
 import secrets_store
 import requests
 import json
+import pandas as pd
 import loadData
-import writeData
+import service
+import export
 
 api_key = secrets_store.steamKey
 steam_id = secrets_store.userID
 
 data_setup = loadData.dataSetUp()
-record_data = writeData.WriteData()
 
 '''
 url = f'http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/?key={api_key}&steamid={steam_id}&include_appinfo=1&include_played_free_games=1&format=json'
@@ -34,40 +35,29 @@ if response.status_code == 200:
 else:
     print(f"Error: {response.status_code}, {response.text}")
 '''
-url = f'http://api.steampowered.com/IPlayerService/GetRecentlyPlayedGames/v0001/?key={api_key}&steamid={steam_id}&format=json'
-response = requests.get(url)
-if response.status_code == 200:
-    data = response.json()
-    if 'response' in data and 'games' in data['response']:
-        games = data['response']['games']
-        for game in games:
-            appid = game['appid']
-            name = game.get('name', 'N/A')
-            playtime_2weeks = game.get('playtime_2weeks', 0)
-            playtime_forever = game.get('playtime_forever', 0)
-            img_icon_url = game.get('img_icon_url')
-
-            print(f"Game ID: {appid}, Name: {name}, Playtime (2 weeks): {playtime_2weeks} minutes, Playtime (forever): {playtime_forever} minutes")
-            
-    else:
-        print("No games played recently.")
-else:
-    print(f"Error: {response.status_code}, {response.text}")
-
-
+# Only the recently played games are refreshed, unless the full library is due a reconciliation
+full_sync, changed = data_setup.syncOwnedGames()
+print(f"Full owned games sync: {full_sync}, changed games: {changed}")
 
-df = data_setup.getOwnedGames()
-print(df)
-csv_df = df[['Game ID', 'Name', 'Playtime (2 weeks)', 'Playtime (forever)', 'Icon URL']]
+df = pd.read_sql_table('owned_games', data_setup.engine)
+csv_df = df[['Game ID', 'Name', 'Playtime (2 weeks)', 'Playtime (forever)']].assign(**{'Icon URL': loadData.dataSetUp.iconUrls(df)})
 csv_filename = 'owned_games.csv'  # Specify the desired filename
 csv_df.to_csv(csv_filename, index=False)
-ownedgames = record_data.writeData(df, 'owned_games')
-print(ownedgames)
+export.writeSnapshot(df, 'owned_games')
 zero_playtime_count = df['Playtime (forever)'] == 0
 zero_playtime_games = df[zero_playtime_count]
 
-updating = data_setup.updateGameDetails(df)
-print(f"Updating game details has returned: {updating}")
+# New games only arrive with a full sync, so the details are only checked then
+if full_sync:
+    updating = data_setup.updateGameDetails(df)
+    print(f"Updating game details has returned: {updating}")
+    export.writeSnapshot(pd.read_sql_table('game_details', data_setup.engine), 'game_details')
+
+# Let a running recommendation service pick up the new data
+if full_sync:
+    service.notifyReload()
+elif changed:
+    service.notifyReload(changed)
 
 print(f"Number of games with zero playtime: {len(zero_playtime_games)}")
 
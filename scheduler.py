@@ -0,0 +1,206 @@
+'''
+Background sync scheduler.
+
+Replaces the all-or-nothing run of main.py with a daemon that decides what to refresh and
+when. Recently played games get their playtime refreshed often, the full owned games list is
+reconciled rarely, and game details are revalidated by age, a capped number per cycle. Every
+Steam API request goes through one rate limiter and the jobs wait on priority queues.
+
+Run with `python scheduler.py`.
+'''
+# Standard library imports
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+
+# Local application imports
+import loadData
+import service
+
+# Job priorities, lower runs first
+PRIORITY_RECENT = 0
+PRIORITY_OWNED = 1
+PRIORITY_DETAILS = 2
+
+
+class RateLimiter:
+    def __init__(self, interval) -> None:
+        '''
+        Initialisation of the RateLimiter class.
+
+        Parameters:
+            interval (float): The minimum number of seconds between two requests.
+        '''
+        self.interval = interval
+        self.last_request = None
+
+    def wait(self):
+        '''
+        Block until the next request is allowed.
+        '''
+        if self.last_request is not None:
+            remaining = self.last_request + self.interval - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        self.last_request = time.monotonic()
+
+
+class SyncScheduler:
+    def __init__(self, data_setup=None, recent_interval=600, owned_interval=86400,
+                 details_max_age=timedelta(days=30), details_per_cycle=20,
+                 request_interval=3.0, cycle_interval=60) -> None:
+        '''
+        Initialisation of the SyncScheduler class.
+
+        Parameters:
+            data_setup (dataSetUp): The loader used to talk to the Steam API and the database.
+            recent_interval (float): Seconds between playtime refreshes of recently played games.
+            owned_interval (float): Seconds between full reconciliations of the owned games list.
+            details_max_age (timedelta): Age after which a game's details are revalidated.
+            details_per_cycle (int): The maximum number of details requests per cycle.
+            request_interval (float): The minimum number of seconds between API requests.
+            cycle_interval (float): Seconds to sleep between cycles.
+        '''
+        self.data_setup = data_setup or loadData.dataSetUp()
+        self.recent_interval = recent_interval
+        self.owned_interval = owned_interval
+        self.details_max_age = details_max_age
+        self.details_per_cycle = details_per_cycle
+        self.cycle_interval = cycle_interval
+        self.limiter = RateLimiter(request_interval)
+
+        # Jobs waiting for their due time, ordered by due time
+        self.timers = []
+        # Jobs that are due, ordered by priority then due time
+        self.ready = []
+        # Tie breaker so jobs themselves are never compared
+        self.counter = itertools.count()
+        # Details jobs already queued, to avoid queueing a game twice
+        self.queued_details = set()
+
+        # The recurring jobs start straight away
+        now = time.monotonic()
+        self.schedule(now, PRIORITY_RECENT, ('recent',))
+        self.schedule(now, PRIORITY_OWNED, ('owned',))
+
+    def schedule(self, due, priority, job):
+        '''
+        Queue a job to become ready at a given time.
+
+        Parameters:
+            due (float): The time.monotonic() value at which the job becomes ready.
+            priority (int): The job priority, lower runs first.
+            job (tuple): The job name followed by its arguments.
+        '''
+        heapq.heappush(self.timers, (due, priority, next(self.counter), job))
+
+    def promoteDueJobs(self, now):
+        '''
+        Move every job whose due time has passed onto the ready queue.
+        '''
+        while self.timers and self.timers[0][0] <= now:
+            due, priority, count, job = heapq.heappop(self.timers)
+            heapq.heappush(self.ready, (priority, due, count, job))
+
+    def planDetails(self):
+        '''
+        Queue details revalidation for the stalest games, up to the per cycle cap.
+        '''
+        cutoff = datetime.now() - self.details_max_age
+        for app_id in self.data_setup.getStaleGameDetails(cutoff, self.details_per_cycle):
+            if app_id not in self.queued_details:
+                self.queued_details.add(app_id)
+                self.schedule(time.monotonic(), PRIORITY_DETAILS, ('details', app_id))
+
+    def runJob(self, job):
+        '''
+        Run one job and reschedule it if it is recurring.
+
+        Returns:
+            list or None: The Game IDs that changed, or None if any game may have changed.
+        '''
+        name = job[0]
+        now = time.monotonic()
+
+        if name == 'recent':
+            self.schedule(now + self.recent_interval, PRIORITY_RECENT, job)
+            self.limiter.wait()
+            df_recent = self.data_setup.getRecentlyPlayedGames()
+            if df_recent is None:
+                return []
+            return self.data_setup.updateRecentPlaytime(df_recent)
+
+        if name == 'owned':
+            self.schedule(now + self.owned_interval, PRIORITY_OWNED, job)
+            self.limiter.wait()
+            df = self.data_setup.getOwnedGames()
+            if df is None:
+                return []
+            self.data_setup.updateOwnedGamesInfo(df)
+            # Lets main.py skip its own full sync while this one is recent
+            self.data_setup.record_data.recordSync('full', datetime.now(), len(df))
+            return None
+
+        if name == 'details':
+            app_id = job[1]
+            self.queued_details.discard(app_id)
+            self.limiter.wait()
+            self.data_setup.refreshGameDetails(app_id, datetime.now())
+            return [app_id]
+
+        raise ValueError(f"Unknown job {job}")
+
+    def runCycle(self):
+        '''
+        Run every job that is due, highest priority first, with details requests capped.
+        '''
+        self.planDetails()
+        self.promoteDueJobs(time.monotonic())
+
+        changed = set()
+        reload_all = False
+        details_run = 0
+        deferred = []
+
+        while self.ready:
+            priority, due, count, job = heapq.heappop(self.ready)
+
+            # Leave details beyond the cap for the next cycle
+            if job[0] == 'details' and details_run >= self.details_per_cycle:
+                deferred.append((priority, due, count, job))
+                continue
+
+            try:
+                result = self.runJob(job)
+            except Exception as e:
+                print(f"Job {job} failed: {e}")
+                continue
+
+            if job[0] == 'details':
+                details_run += 1
+            if result is None:
+                reload_all = True
+            else:
+                changed.update(result)
+
+        for entry in deferred:
+            heapq.heappush(self.ready, entry)
+
+        # Let a running recommendation service pick up the new data
+        if reload_all:
+            service.notifyReload()
+        elif changed:
+            service.notifyReload(sorted(changed))
+
+    def run(self):
+        '''
+        Run cycles until interrupted.
+        '''
+        while True:
+            self.runCycle()
+            time.sleep(self.cycle_interval)
+
+
+if __name__ == '__main__':
+    SyncScheduler().run()
@@ -0,0 +1,215 @@
+'''
+Managed schema for the steamdata database.
+
+The tables are declared here with their primary keys and indexes instead of being created
+by DataFrame.to_sql. migrate() brings a database up to SCHEMA_VERSION by running each pending
+migration in order and recording the version reached in the schema_version table.
+'''
+import sqlalchemy
+from sqlalchemy import (Boolean, Column, DateTime, Index, Integer, MetaData, PrimaryKeyConstraint,
+                        String, Table, Text, text)
+from sqlalchemy.dialects.mysql import MEDIUMBLOB
+
+metadata = MetaData()
+
+owned_games = Table(
+    'owned_games', metadata,
+    Column('Game ID', Integer, primary_key=True, autoincrement=False),
+    Column('Name', String(255)),
+    Column('Playtime (2 weeks)', Integer, nullable=False, default=0),
+    Column('Playtime (forever)', Integer, nullable=False, default=0),
+    Column('Icon Hash', String(64)),
+    Column('Completed', Boolean, nullable=False, default=False),
+    Column('Broken', Boolean, nullable=False, default=False),
+    Column('Endless', Boolean, nullable=False, default=False),
+    Column('selected', Boolean, nullable=False, default=False),
+    # Serves the status filters of GameSelection.uncompletedgames and completedgames
+    Index('ix_owned_games_status', 'Completed', 'Broken', 'Endless', 'selected'),
+    mysql_charset='utf8mb4'
+)
+
+game_details = Table(
+    'game_details', metadata,
+    Column('Game ID', Integer, primary_key=True, autoincrement=False),
+    Column('Name', String(255)),
+    Column('Genre', String(255)),
+    Column('Controller Support', String(32)),
+    Column('Is Free', Boolean),
+    Column('Released', String(64)),
+    Column('Windows', Boolean),
+    Column('Mac', Boolean),
+    Column('Linux', Boolean),
+    Column('Metacritic Score', Integer),
+    Column('Metacritic Url', Text),
+    Column('header_image', Text),
+    Column('capsule_image', Text),
+    Column('capsule_imagev5', Text),
+    Column('website', Text),
+    mysql_charset='utf8mb4'
+)
+
+game_text = Table(
+    'game_text', metadata,
+    Column('Game ID', Integer, nullable=False, autoincrement=False),
+    Column('Field', String(32), nullable=False),
+    Column('Body', MEDIUMBLOB, nullable=False),
+    PrimaryKeyConstraint('Game ID', 'Field'),
+    mysql_charset='utf8mb4'
+)
+
+sync_state = Table(
+    'sync_state', metadata,
+    Column('Game ID', Integer, primary_key=True, autoincrement=False),
+    Column('Details Fetched At', DateTime),
+    mysql_charset='utf8mb4'
+)
+
+sync_log = Table(
+    'sync_log', metadata,
+    Column('Kind', String(32), primary_key=True),
+    Column('Last Run', DateTime, nullable=False),
+    Column('Game Count', Integer),
+    mysql_charset='utf8mb4'
+)
+
+schema_version = Table(
+    'schema_version', metadata,
+    Column('version', Integer, nullable=False)
+)
+
+# Columns of tables created before the managed schema that map onto a new column
+LEGACY_COLUMNS = {
+    ('owned_games', 'Icon Hash'): ('Icon URL', "SUBSTRING_INDEX(SUBSTRING_INDEX(`Icon URL`, '/', -1), '.', 1)")
+}
+
+# Column added to an unmanaged table to copy its rows in insertion order
+ROW_NUMBER_COLUMN = '_row_number'
+
+
+def numberRows(connection, table_name):
+    '''
+    Add ROW_NUMBER_COLUMN to an unmanaged table, unless an earlier migration step already did.
+
+    InnoDB assigns the values in insertion order for a table without a key, so ordering by the
+    column reads the rows oldest first.
+    '''
+    columns = {column['name'].lower() for column in sqlalchemy.inspect(connection).get_columns(table_name)}
+    if ROW_NUMBER_COLUMN.lower() not in columns:
+        connection.execute(text(f'ALTER TABLE `{table_name}` ADD COLUMN `{ROW_NUMBER_COLUMN}` BIGINT AUTO_INCREMENT UNIQUE'))
+
+
+def rebuildTable(connection, table):
+    '''
+    Create a managed table, or rebuild an unmanaged one created by to_sql into it.
+
+    Rows are copied in the order they were inserted and a later copy of a duplicate key
+    replaces an earlier one, so the latest row of each key is kept. Values longer than their
+    new column are reported and cut to fit. Tables that already have a primary key are left
+    untouched.
+
+    Parameters:
+        connection (Connection): An open database connection.
+        table (Table): The managed table definition.
+    '''
+    inspector = sqlalchemy.inspect(connection)
+    if not inspector.has_table(table.name):
+        table.create(connection)
+        return
+    if inspector.get_pk_constraint(table.name)['constrained_columns']:
+        return
+
+    existing = {column['name'].lower() for column in inspector.get_columns(table.name)}
+    staging_name = f'{table.name}_migrating'
+    connection.execute(text(f'DROP TABLE IF EXISTS `{staging_name}`'))
+    table.to_metadata(MetaData(), name=staging_name).create(connection)
+
+    numberRows(connection, table.name)
+
+    # Copy the columns the old table has, deriving renamed ones from their legacy column
+    columns, expressions = [], []
+    for column in table.columns:
+        if column.name.lower() in existing:
+            expression = f'`{column.name}`'
+        elif (table.name, column.name) in LEGACY_COLUMNS and LEGACY_COLUMNS[(table.name, column.name)][0].lower() in existing:
+            expression = LEGACY_COLUMNS[(table.name, column.name)][1]
+        else:
+            continue
+
+        # Report values that do not fit the new column before they are cut to fit
+        length = getattr(column.type, 'length', None)
+        if isinstance(column.type, String) and length:
+            too_long = connection.execute(text(
+                f'SELECT COUNT(*) FROM `{table.name}` WHERE CHAR_LENGTH({expression}) > {length}')).scalar()
+            if too_long:
+                print(f"Migrating {table.name}: {too_long} values of {column.name} are cut to {length} characters")
+            expression = f'LEFT({expression}, {length})'
+
+        columns.append(f'`{column.name}`')
+        expressions.append(expression)
+
+    keys = {f'`{column.name}`' for column in table.primary_key}
+    updates = ', '.join(f'{column} = VALUES({column})' for column in columns if column not in keys)
+    connection.execute(text(f'''
+        INSERT {'' if updates else 'IGNORE '}INTO `{staging_name}` ({', '.join(columns)})
+        SELECT {', '.join(expressions)} FROM `{table.name}` ORDER BY `{ROW_NUMBER_COLUMN}`
+        {f'ON DUPLICATE KEY UPDATE {updates}' if updates else ''}
+    '''))
+    connection.execute(text(f'DROP TABLE `{table.name}`'))
+    connection.execute(text(f'RENAME TABLE `{staging_name}` TO `{table.name}`'))
+
+
+def moveLongText(record_data):
+    # Long text has to leave game_details before the table is rebuilt without those columns
+    with record_data.engine.begin() as connection:
+        rebuildTable(connection, game_text)
+    record_data.migrateLongText()
+
+
+def createKeyedTables(record_data):
+    with record_data.engine.begin() as connection:
+        for table in (owned_games, game_details, game_text, sync_state):
+            rebuildTable(connection, table)
+
+
+def createSyncLog(record_data):
+    with record_data.engine.begin() as connection:
+        rebuildTable(connection, sync_log)
+
+
+# Migrations in order, the position in the list plus one is the version they bring the schema to
+MIGRATIONS = [
+    moveLongText,
+    createKeyedTables,
+    createSyncLog
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def currentVersion(engine):
+    '''
+    Read the schema version of the database, 0 for a database that predates the managed schema.
+    '''
+    with engine.begin() as connection:
+        schema_version.create(connection, checkfirst=True)
+        version = connection.execute(sqlalchemy.select(sqlalchemy.func.max(schema_version.c.version))).scalar()
+    return version or 0
+
+
+def migrate(record_data):
+    '''
+    Run every pending migration and record the version reached.
+
+    Parameters:
+        record_data (WriteData): The writer whose database is migrated.
+
+    Returns:
+        int: The schema version of the database after migrating.
+    '''
+    version = currentVersion(record_data.engine)
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        print(f"Migrating steamdata schema to version {number}")
+        migration(record_data)
+        with record_data.engine.begin() as connection:
+            connection.execute(schema_version.insert().values(version=number))
+    return max(version, SCHEMA_VERSION)
@@ -0,0 +1,205 @@
+'''
+Hybrid scoring engine for the recommenders.
+
+One feature matrix is built per game, holding the TF-IDF vector of its description and its
+genres, plus a small table of per-game priors (Metacritic score, free, controller support,
+platforms and playtime). A strategy is a preset: a reference set of games and weights over
+these signals. Every candidate is scored against every reference game in one sparse matrix
+product, so adding a strategy does not add another fetch, clean and vectorise pipeline.
+'''
+import warnings
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MultiLabelBinarizer, normalize
+
+# Signals compared between a candidate and each reference game
+SIMILARITY_SIGNALS = ('text', 'genre')
+
+# Signals that only depend on the candidate itself, all scaled to 0-1
+PRIOR_SIGNALS = ('metacritic', 'free', 'controller', 'windows', 'mac', 'linux', 'playtime')
+
+# Strategies as weight presets. 'reference' names the set of games candidates are compared to
+PRESETS = {
+    'playtime': {'reference': 'top_playtime', 'exclude_self': True, 'weights': {'text': 1.0}},
+    'completed': {'reference': 'completed', 'exclude_self': False, 'weights': {'text': 1.0}},
+    'recent': {'reference': 'recently_played', 'exclude_self': True, 'weights': {'text': 1.0}},
+    'hybrid': {'reference': 'completed', 'exclude_self': False,
+               'weights': {'text': 0.6, 'genre': 0.3, 'metacritic': 0.1, 'controller': 0.05}}
+}
+
+# Description TF-IDF settings. The IDF is always learnt over the whole library, in memory and
+# when streaming, so every preset ranks with the same term weights
+TEXT_MAX_DF = 0.8
+TEXT_MIN_DF = 2
+
+# Controller support values mapped onto the 'controller' prior
+CONTROLLER_SUPPORT = {'full': 1.0, 'partial': 0.5}
+
+
+def genreLists(games):
+    # The genres of each game as a list, empty when the game has no details
+    return [[genre.strip() for genre in value.split(',') if genre.strip()] if isinstance(value, str) else []
+            for value in games.get('Genre', pd.Series([None] * len(games)))]
+
+
+def priorColumns(games):
+    '''
+    Build the per game priors, one column per PRIOR_SIGNALS entry in the order of games.
+    '''
+    def column(name, default=0.0):
+        return games[name] if name in games.columns else pd.Series([default] * len(games), index=games.index)
+
+    playtime = np.log1p(column('Playtime (forever)').fillna(0).to_numpy(dtype=float))
+    return np.column_stack([
+        column('Metacritic Score').astype(float).fillna(0).to_numpy() / 100.0,
+        column('Is Free').fillna(False).astype(float).to_numpy(),
+        column('Controller Support', None).map(CONTROLLER_SUPPORT).fillna(0).to_numpy(dtype=float),
+        column('Windows').fillna(False).astype(float).to_numpy(),
+        column('Mac').fillna(False).astype(float).to_numpy(),
+        column('Linux').fillna(False).astype(float).to_numpy(),
+        playtime / playtime.max() if len(playtime) and playtime.max() > 0 else playtime
+    ])
+
+
+class HybridScorer:
+    def __init__(self, stop_words, max_df=TEXT_MAX_DF, min_df=TEXT_MIN_DF) -> None:
+        '''
+        Initialisation of the HybridScorer class.
+
+        Parameters:
+            stop_words (list): Stop words for the description TF-IDF.
+            max_df (float): Ignore terms in more than this share of all games.
+            min_df (int): Ignore terms in fewer than this number of games.
+        '''
+        self.vectorizer = TfidfVectorizer(stop_words=stop_words, max_df=max_df, min_df=min_df, ngram_range=(1, 2))
+
+    def fit(self, games, descriptions):
+        '''
+        Build the feature matrix and priors for every game.
+
+        Parameters:
+            games (DataFrame): Owned games merged with their details, one row per game.
+            descriptions (Series): The cleaned description of each game, aligned with games.
+
+        Returns:
+            HybridScorer: The fitted scorer.
+        '''
+        self.game_ids = games['Game ID'].to_numpy(dtype=np.int64)
+        self.positions = pd.Index(self.game_ids)
+        self.descriptions = descriptions.reset_index(drop=True)
+
+        # Similarity blocks, each row normalised so a block contributes a cosine similarity
+        try:
+            text = normalize(self.vectorizer.fit_transform(self.descriptions))
+            self.text_fitted = True
+        except ValueError:
+            # Too few games or no stored descriptions leave no vocabulary, the other signals still work
+            text = sp.csr_matrix((len(games), 0))
+            self.text_fitted = False
+        self.genre_binarizer = MultiLabelBinarizer(sparse_output=True)
+        genres = normalize(self.genre_binarizer.fit_transform(genreLists(games)).astype(float))
+
+        self.features = sp.hstack([text, genres]).tocsr()
+        self.block_slices = {'text': slice(0, text.shape[1]),
+                             'genre': slice(text.shape[1], text.shape[1] + genres.shape[1])}
+        self.priors = priorColumns(games)
+        return self
+
+    def update(self, games, game_ids, descriptions):
+        '''
+        Bring the scorer up to date after some games changed, without refitting.
+
+        The vocabulary, IDF and genre list stay as fitted. Only the changed games' rows are
+        transformed again, games no longer owned are dropped and the priors are recomputed for
+        every game, as playtime is scaled by the library maximum.
+
+        Parameters:
+            games (DataFrame): Owned games merged with their details, one row per game.
+            game_ids (iterable): The Game IDs that changed.
+            descriptions (Series): The cleaned description of each changed game that is still
+                                   owned, indexed by Game ID.
+
+        Returns:
+            HybridScorer: The updated scorer.
+        '''
+        owned_ids = games['Game ID'].to_numpy(dtype=np.int64)
+        changed_ids = np.intersect1d(np.asarray(list(game_ids), dtype=np.int64), owned_ids)
+        kept = np.isin(self.game_ids, owned_ids) & ~np.isin(self.game_ids, changed_ids)
+
+        changed_games = games.set_index('Game ID').loc[changed_ids].reset_index()
+        changed_descriptions = descriptions.reindex(changed_ids).fillna('').reset_index(drop=True)
+        if self.text_fitted:
+            text = normalize(self.vectorizer.transform(changed_descriptions))
+        else:
+            text = sp.csr_matrix((len(changed_ids), 0))
+        with warnings.catch_warnings():
+            # Genres that were not seen when fitting are left out
+            warnings.simplefilter('ignore', UserWarning)
+            genres = normalize(self.genre_binarizer.transform(genreLists(changed_games)).astype(float))
+
+        self.game_ids = np.concatenate([self.game_ids[kept], changed_ids])
+        self.positions = pd.Index(self.game_ids)
+        self.descriptions = pd.concat([self.descriptions[kept], changed_descriptions], ignore_index=True)
+        self.features = sp.vstack([self.features[np.flatnonzero(kept)], sp.hstack([text, genres])]).tocsr()
+        self.priors = priorColumns(games.set_index('Game ID').loc[self.game_ids].reset_index())
+        return self
+
+    def score(self, candidate_ids, reference_ids, weights, exclude_self=False, limit=10):
+        '''
+        Score every candidate against the reference games in one vectorised pass.
+
+        A candidate's similarity score is the mean of its top 10% weighted similarities to the
+        reference games, to which the weighted priors are added.
+
+        Parameters:
+            candidate_ids (iterable): The Game IDs to rank.
+            reference_ids (iterable): The Game IDs to compare against.
+            weights (dict): Weight per signal name, missing signals count as 0.
+            exclude_self (bool): Do not compare a game with itself.
+            limit (int): The number of top candidates to return.
+
+        Returns:
+            list: Recommendation dictionaries, best first.
+        '''
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        reference_ids = np.asarray(reference_ids, dtype=np.int64)
+        # Only games the scorer was fitted on can be scored
+        candidate_ids = candidate_ids[self.positions.get_indexer(candidate_ids) >= 0]
+        reference_ids = reference_ids[self.positions.get_indexer(reference_ids) >= 0]
+        if not len(candidate_ids) or not len(reference_ids):
+            return []
+
+        # Weight each similarity block through the columns of one diagonal matrix
+        column_weights = np.zeros(self.features.shape[1])
+        for signal in SIMILARITY_SIGNALS:
+            column_weights[self.block_slices[signal]] = weights.get(signal, 0.0)
+
+        candidates = self.features[self.positions.get_indexer(candidate_ids)]
+        references = self.features[self.positions.get_indexer(reference_ids)]
+        similarity = (candidates @ sp.diags(column_weights) @ references.T).toarray()
+        if exclude_self:
+            similarity[candidate_ids[:, None] == reference_ids[None, :]] = -np.inf
+
+        # Top 10% of reference games per candidate, sorted best first
+        k = max(1, int(len(reference_ids) * 0.1))
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        valid = np.isfinite(top_scores)
+        mean_scores = np.where(valid, top_scores, 0).sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+
+        prior_weights = np.array([weights.get(signal, 0.0) for signal in PRIOR_SIGNALS])
+        totals = mean_scores + self.priors[self.positions.get_indexer(candidate_ids)] @ prior_weights
+
+        best = np.argsort(-totals, kind='stable')[:limit]
+        return [{
+            'Uncompleted Game ID': int(candidate_ids[i]),
+            'Recommendations': reference_ids[top[i][valid[i]][:5]].tolist(),
+            'Mean Similarity Score': float(totals[i])
+        } for i in best]
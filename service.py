@@ -0,0 +1,193 @@
+'''
+Local recommendation service.
+
+Keeps a GameSelection warm in memory and serves recommendations over HTTP on localhost, so
+each request is answered without a fresh interpreter, database round trips or refitting.
+
+Endpoints:
+    GET  /recommend/<strategy>  strategy is one of playtime, completed, recent, hybrid or
+                                neverplayed
+    POST /reload                body {"game_ids": [...]} refreshes those games, or every game
+                                if no IDs are given
+
+Run with `python service.py`.
+'''
+# Standard library imports
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Third-party library imports
+import pandas as pd
+import requests
+
+# Local application imports
+import recommendation
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Map each strategy name to the GameSelection method that serves it
+STRATEGIES = {
+    'playtime': 'recommendBasedOnPlaytime',
+    'completed': 'recommendBasedOnCompleted',
+    'recent': 'recommendBasedOnRecent',
+    'hybrid': 'recommendHybrid',
+    'neverplayed': 'neverPlayedSelection'
+}
+
+# Strategies that pick at random, so their result is not cached between requests
+RANDOM_STRATEGIES = {'neverplayed'}
+
+
+class RecommendationService:
+    def __init__(self, selection=None) -> None:
+        '''
+        Initialisation of the RecommendationService class.
+
+        Loads the game tables into memory through GameSelection.warm(). Recommendation results
+        are cached per strategy until the next reload.
+
+        Parameters:
+            selection (GameSelection): Optional GameSelection to serve from, mainly for testing.
+        '''
+        self.selection = selection or recommendation.GameSelection(show_plots=False)
+        self.selection.warm()
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def recommend(self, strategy):
+        '''
+        Get the recommendations for a strategy, computing them only if they are not cached.
+
+        Parameters:
+            strategy (str): One of the names in STRATEGIES.
+
+        Returns:
+            The result of the corresponding GameSelection method.
+        '''
+        with self.lock:
+            if strategy in RANDOM_STRATEGIES or strategy not in self.results:
+                self.results[strategy] = getattr(self.selection, STRATEGIES[strategy])()
+            return self.results[strategy]
+
+    def reload(self, game_ids=None):
+        '''
+        Refresh the in-memory data after a sync and drop the cached recommendations.
+
+        Parameters:
+            game_ids (list): The games that changed. If None, every game is reloaded.
+        '''
+        with self.lock:
+            if game_ids:
+                self.selection.refreshGames(game_ids)
+            else:
+                self.selection.warm()
+            self.results.clear()
+
+
+def toJson(result):
+    '''
+    Serialise a recommendation result, converting pandas and numpy values to plain JSON.
+    '''
+    def convert(value):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return json.loads(value.to_json(orient='records' if isinstance(value, pd.DataFrame) else 'index'))
+        if hasattr(value, 'item'):
+            return value.item()
+        return str(value)
+
+    return json.dumps(result, default=convert)
+
+
+def makeHandler(service):
+    '''
+    Build a request handler class bound to a RecommendationService.
+    '''
+    class Handler(BaseHTTPRequestHandler):
+        def send(self, status, body):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            parts = urlsplit(self.path).path.strip('/').split('/')
+            if len(parts) != 2 or parts[0] != 'recommend' or parts[1] not in STRATEGIES:
+                self.send(404, json.dumps({'error': f'Unknown path {self.path}'}))
+                return
+            try:
+                self.send(200, toJson(service.recommend(parts[1])))
+            except Exception as e:
+                print(f"Recommendation Error for {parts[1]}: {e}")
+                self.send(500, json.dumps({'error': str(e)}))
+
+        def do_POST(self):
+            if urlsplit(self.path).path.rstrip('/') != '/reload':
+                self.send(404, json.dumps({'error': f'Unknown path {self.path}'}))
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                game_ids = body.get('game_ids')
+                if game_ids is not None:
+                    game_ids = [int(game_id) for game_id in game_ids]
+            except (ValueError, TypeError, AttributeError) as e:
+                self.send(400, json.dumps({'error': f'Invalid reload body: {e}'}))
+                return
+            try:
+                service.reload(game_ids)
+            except Exception as e:
+                print(f"Reload Error: {e}")
+                self.send(500, json.dumps({'error': str(e)}))
+                return
+            self.send(200, json.dumps({'reloaded': game_ids or 'all'}))
+
+        def log_message(self, format, *args):
+            # Keep the console quiet, requests are frequent and uninteresting
+            pass
+
+    return Handler
+
+
+def serve(host=HOST, port=PORT, service=None):
+    '''
+    Start the service and block until interrupted.
+
+    Parameters:
+        host (str): The address to bind, localhost by default.
+        port (int): The port to listen on.
+        service (RecommendationService): Optional service to expose, a new one by default.
+    '''
+    server = ThreadingHTTPServer((host, port), makeHandler(service or RecommendationService()))
+    print(f"Serving recommendations on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def notifyReload(game_ids=None, host=HOST, port=PORT):
+    '''
+    Tell a running service that a sync has written new data.
+
+    Does nothing if the service is not running.
+
+    Parameters:
+        game_ids (list): The games that changed. If None, the service reloads every game.
+    '''
+    if game_ids is not None and len(game_ids) == 0:
+        return True
+    body = {'game_ids': [int(game_id) for game_id in game_ids]} if game_ids is not None else {}
+    try:
+        requests.post(f'http://{host}:{port}/reload', json=body, timeout=30)
+        return True
+    except requests.exceptions.RequestException:
+        return False
+
+
+if __name__ == '__main__':
+    serve()